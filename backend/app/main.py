@@ -2,6 +2,8 @@ from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import anyio.to_thread
 import os
 import time
 from .models import ProcessImageResponse
@@ -9,7 +11,14 @@ from .services.ocr_service import OCRService
 from .services.vision_detector import VisionDetector
 from .services.image_processor import ImageProcessor
 
-app = FastAPI(title="PII Detection API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Model loading happens here instead of inside the first upload request
+    if vision_detector:
+        await run_in_pipeline(vision_detector.warm_up)
+    yield
+
+app = FastAPI(title="PII Detection API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +42,17 @@ try:
 except Exception as e:
     print(f"Service initialization failed: {e}")
 
+# The EasyOCR reader and spaCy pipelines are shared and not safe to call concurrently,
+# so images go through the blocking pipeline one at a time, off the event loop
+_pipeline_limiter = None
+
+async def run_in_pipeline(func, *args):
+    global _pipeline_limiter
+    if _pipeline_limiter is None:
+        # Built lazily: anyio needs a running event loop to create it
+        _pipeline_limiter = anyio.CapacityLimiter(1)
+    return await anyio.to_thread.run_sync(func, *args, limiter=_pipeline_limiter)
+
 def normalize_path_for_web(path):
     if path is None:
         return None
@@ -70,15 +90,16 @@ async def process_image(file: UploadFile = File(...)):
             content = await file.read()
             buffer.write(content)
         
-        ocr_result = ocr_service.extract_text_from_image(file_path)
-        detected_entities = vision_detector.detect_pii_from_image(file_path, ocr_result)
+        ocr_result = await run_in_pipeline(ocr_service.extract_text_from_image, file_path, content)
+        detected_entities = await run_in_pipeline(vision_detector.detect_pii_from_image, file_path, ocr_result, content)
         
         masked_image_path = None
         preview_image_path = None
         if detected_entities:
             try:
-                masked_image_path = image_processor.mask_pii_areas(file_path, detected_entities)
-                preview_image_path = image_processor.create_preview(file_path, detected_entities)
+                masked_image_path, preview_image_path = await run_in_pipeline(
+                    image_processor.mask_and_preview, file_path, detected_entities, content
+                )
             except Exception as e:
                 print(f"Image processing failed: {e}")
         
@@ -95,8 +116,7 @@ async def process_image(file: UploadFile = File(...)):
         
         extracted_text = ""
         if ocr_result.get('success'):
-            text_blocks = ocr_result.get('text_blocks', [])
-            extracted_text = " ".join([block.get('text', '') for block in text_blocks])
+            extracted_text = ocr_result.get('full_text', '')
         
         return ProcessImageResponse(
             success=True,
@@ -1,43 +1,112 @@
 import logging
+import os
 import re
-from typing import List, Dict
+import threading
+from functools import lru_cache
+from typing import List, Dict, Tuple
 from ..models import PIIEntity
-from .pii_patterns import get_pii_patterns, should_exclude_text
+from .pii_patterns import AADHAAR_SEGMENT_PATTERN, ENTITY_REQUIREMENTS, text_features, get_compiled_pii_patterns, should_exclude_text
 
 logger = logging.getLogger(__name__)
 
+# Cheap pre-check before running Presidio/spaCy on a block: without digits, an @,
+# a capital letter, a dotted word (URLs) or Devanagari there is nothing for it to find
+_PRESIDIO_CANDIDATE_RE = re.compile(r'\d|@|[A-Z]|\w\.\w|[\u0900-\u097F]')
+
+# PIIEntity.model_construct on pydantic v2, PIIEntity.construct on v1
+_construct_entity = getattr(PIIEntity, 'model_construct', None) or PIIEntity.construct
+
+def _make_entity(text: str, entity_type: str, confidence: float, bbox: List[int]) -> PIIEntity:
+    # Values come from OCR blocks and Presidio and are already typed, so the
+    # per-entity pydantic validation is skipped
+    return _construct_entity(text=text, entity_type=entity_type, confidence=confidence, bbox=bbox)
+
+PRESIDIO_ENTITY_MAPPING = {
+    'PERSON': 'person',
+    'EMAIL_ADDRESS': 'email',
+    'PHONE_NUMBER': 'phone_number',
+    'CREDIT_CARD': 'credit_card',
+    'DATE_TIME': 'date_time',
+    'URL': 'url',
+    'IP_ADDRESS': 'ip_address',
+    'IBAN_CODE': 'iban',
+    'US_SSN': 'ssn',
+    'US_PASSPORT': 'passport',
+    'US_DRIVER_LICENSE': 'driver_license',
+    'LOCATION': 'location',  # May catch some pincodes
+}
+
+# Deterministic ID types found by the custom patterns
+_STRUCTURED_ID_TYPES = frozenset(['aadhaar_number', 'pan_number'])
+
+def _is_structured_id_block(text: str, entities: List[PIIEntity]) -> bool:
+    # The whole block is a high-confidence ID match, so NER has nothing left to find
+    return any(
+        entity.entity_type in _STRUCTURED_ID_TYPES and entity.confidence >= 0.95 and entity.text == text
+        for entity in entities
+    )
+
+_presidio_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def _load_presidio():
+    try:
+        from presidio_analyzer import AnalyzerEngine
+        from presidio_analyzer.nlp_engine import NlpEngineProvider
+        import spacy
+        
+        # Opt-in GPU for spaCy; must happen before the models are loaded
+        if os.getenv("MINDCRAFT_USE_GPU") == "1":
+            if spacy.prefer_gpu():
+                logger.info("spaCy running on GPU")
+        
+        # en_core_web_sm by default: NER is only one signal next to the regex patterns,
+        # and the small model loads and runs much faster than en_core_web_lg
+        en_model = os.getenv("MINDCRAFT_SPACY_MODEL", "en_core_web_sm")
+        
+        # Presidio only spacy.load()s the model, it doesn't download it
+        if not spacy.util.is_package(en_model):
+            logger.warning(f"spaCy model {en_model} is not installed, using en_core_web_lg")
+            en_model = "en_core_web_lg"
+        
+        # Configure Presidio for both English and Hindi
+        configuration = {
+            "nlp_engine_name": "spacy",
+            "models": [
+                {"lang_code": "en", "model_name": en_model},
+                {"lang_code": "hi", "model_name": "xx_ent_wiki_sm"},  # Hindi support
+            ],
+        }
+        
+        # Create NLP engine with multi-language support
+        provider = NlpEngineProvider(nlp_configuration=configuration)
+        nlp_engine = provider.create_engine()
+        
+        # Initialize analyzer with English and Hindi support
+        analyzer = AnalyzerEngine(
+            nlp_engine=nlp_engine,
+            supported_languages=["en", "hi"]
+        )
+        logger.info(f"Presidio analyzer initialized (English: {en_model}, Hindi: xx_ent_wiki_sm)")
+        return analyzer
+        
+    except Exception as e:
+        logger.error(f"Presidio not available, falling back to regex-only detection: {e}")
+        return None
+
+def get_presidio_analyzer():
+    # Shared by every detector instance: the spaCy models are loaded once per
+    # process, on first use
+    with _presidio_lock:
+        return _load_presidio()
+
 class AdvancedPIIDetector:
     def __init__(self):
         logger.info("Advanced PII Detector initializing")
-        
-        self.presidio_analyzer = None
-        
-        try:
-            from presidio_analyzer import AnalyzerEngine
-            from presidio_analyzer.nlp_engine import NlpEngineProvider
-            
-            # Configure Presidio for both English and Hindi
-            configuration = {
-                "nlp_engine_name": "spacy",
-                "models": [
-                    {"lang_code": "en", "model_name": "en_core_web_lg"},
-                    {"lang_code": "hi", "model_name": "xx_ent_wiki_sm"},  # Hindi support
-                ],
-            }
-            
-            # Create NLP engine with multi-language support
-            provider = NlpEngineProvider(nlp_configuration=configuration)
-            nlp_engine = provider.create_engine()
-            
-            # Initialize analyzer with English and Hindi support
-            self.presidio_analyzer = AnalyzerEngine(
-                nlp_engine=nlp_engine,
-                supported_languages=["en", "hi"]
-            )
-            logger.info("Presidio analyzer initialized (English + Hindi)")
-            
-        except Exception as e:
-            logger.warning(f"Presidio not available: {e}")
+    
+    @property
+    def presidio_analyzer(self):
+        return get_presidio_analyzer()
     
     def detect_pii_advanced(self, text_blocks: List[Dict]) -> List[PIIEntity]:
         all_entities = []
@@ -48,54 +117,85 @@ class AdvancedPIIDetector:
         
         logger.info(f"Starting advanced PII detection on {len(text_blocks)} text blocks")
         
+        blocks = []
         for block in text_blocks:
             text = block.get('text', '').strip()
-            if not text:
-                continue
-            
-
-            presidio_entities = self._detect_with_presidio(text, block)
-            all_entities.extend(presidio_entities)
-            
-            custom_entities = self._detect_custom_patterns(text, block)
-            all_entities.extend(custom_entities)
+            if text:
+                blocks.append((text, block))
+        
+        custom_results = [self._detect_custom_patterns(text, block) for text, block in blocks]
+        
+        # Presidio runs once over all candidate blocks so spaCy can batch them.
+        # Blocks that are nothing but an Aadhaar/PAN number are already explained.
+        candidates = [
+            i for i, (text, _) in enumerate(blocks)
+            if _PRESIDIO_CANDIDATE_RE.search(text) and not _is_structured_id_block(text, custom_results[i])
+        ]
+        presidio_results = dict(zip(candidates, self._detect_with_presidio([blocks[i] for i in candidates])))
+        
+        for i in range(len(blocks)):
+            all_entities.extend(presidio_results.get(i, []))
+            all_entities.extend(custom_results[i])
         
         unique_entities = self._deduplicate_entities(all_entities)
         
         logger.info(f" PII detection found {len(unique_entities)} unique entities")
         return unique_entities
     
-    def _detect_with_presidio(self, text: str, block: Dict) -> List[PIIEntity]:
-        entities = []
+    def _detect_with_presidio(self, blocks: List[Tuple[str, Dict]]) -> List[List[PIIEntity]]:
+        # One entity list per input block, in order
+        entities = [[] for _ in blocks]
+        
+        if not blocks:
+            return entities
         
         try:
-          
+            from presidio_analyzer import BatchAnalyzerEngine
+            
+            # nlp.pipe() under the hood instead of one spaCy call per block
+            batch_analyzer = BatchAnalyzerEngine(analyzer_engine=self.presidio_analyzer)
+            
             languages = ['hi', 'en']
+            pending = list(range(len(blocks)))
             
             for lang in languages:
                 try:
-                    results = self.presidio_analyzer.analyze(text=text, language=lang)
+                    batch_results = batch_analyzer.analyze_iterator(
+                        [blocks[i][0] for i in pending], language=lang
+                    )
                     
-                    for result in results:
-                        entity_type = self._map_presidio_entity_type(result.entity_type)
+                    still_pending = []
+                    for i, results in zip(pending, batch_results):
+                        text, block = blocks[i]
+                        bbox = [block['x'], block['y'], block['width'], block['height']]
+                        block_entities = []
                         
-                        if entity_type:
-                            entity = PIIEntity(
-                                text=text[result.start:result.end],
-                                entity_type=entity_type,
-                                confidence=result.score,
-                                bbox=[block['x'], block['y'], block['width'], block['height']]
-                            )
-                            entities.append(entity)
+                        for result in results:
+                            entity_type = self._map_presidio_entity_type(result.entity_type)
                             
-                            logger.debug(f"Presidio ({lang}) detected {entity_type}: '{entity.text}' (confidence: {result.score:.2f})")
+                            if entity_type:
+                                entity = _make_entity(
+                                    text=text[result.start:result.end],
+                                    entity_type=entity_type,
+                                    confidence=result.score,
+                                    bbox=bbox
+                                )
+                                block_entities.append(entity)
+                                
+                                logger.debug("Presidio (%s) detected %s: '%s' (confidence: %.2f)", lang, entity_type, entity.text, result.score)
+                        
+                        # If we found entities in this language, don't try the other
+                        if block_entities:
+                            entities[i] = block_entities
+                        else:
+                            still_pending.append(i)
                     
-                    # If we found entities in this language, don't try the other
-                    if entities:
+                    pending = still_pending
+                    if not pending:
                         break
                         
                 except Exception as e:
-                    logger.debug(f"Presidio detection failed for {lang}: {e}")
+                    logger.debug("Presidio detection failed for %s: %s", lang, e)
                     continue
         
         except Exception as e:
@@ -104,71 +204,32 @@ class AdvancedPIIDetector:
         return entities
     
     def _detect_custom_patterns(self, text: str, block: Dict) -> List[PIIEntity]:
-        entities = []
-        
-        # Check if text should be excluded
-        if should_exclude_text(text):
-            return entities
-        
-        # Get patterns from modular file
-        patterns = get_pii_patterns()
-        
-        for entity_type, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                for match in matches:
-                    if entity_type == 'aadhaar_number' and len(match.group().strip()) == 4 and match.group().isdigit():
-                        if len(text.strip()) == 4:
-                            entity = PIIEntity(
-                                text=match.group(),
-                                entity_type=entity_type,
-                                confidence=0.8,
-                                bbox=[block['x'], block['y'], block['width'], block['height']]
-                            )
-                            entities.append(entity)
-                    else:
-                        entity = PIIEntity(
-                            text=match.group(),
-                            entity_type=entity_type,
-                            confidence=0.95,
-                            bbox=[block['x'], block['y'], block['width'], block['height']]
-                        )
-                        entities.append(entity)
+        bbox = [block['x'], block['y'], block['width'], block['height']]
         
-        return entities
+        return [
+            _make_entity(text=matched_text, entity_type=entity_type, confidence=confidence, bbox=bbox)
+            for matched_text, entity_type, confidence in _match_custom_patterns(text)
+        ]
     
     def _map_presidio_entity_type(self, presidio_type: str) -> str:
-        mapping = {
-            'PERSON': 'person',
-            'EMAIL_ADDRESS': 'email',
-            'PHONE_NUMBER': 'phone_number',
-            'CREDIT_CARD': 'credit_card',
-            'DATE_TIME': 'date_time',
-            'URL': 'url',
-            'IP_ADDRESS': 'ip_address',
-            'IBAN_CODE': 'iban',
-            'US_SSN': 'ssn',
-            'US_PASSPORT': 'passport',
-            'US_DRIVER_LICENSE': 'driver_license',
-            'LOCATION': 'location',  # May catch some pincodes
-        }
-        return mapping.get(presidio_type, presidio_type.lower())
+        entity_type = PRESIDIO_ENTITY_MAPPING.get(presidio_type)
+        return entity_type if entity_type is not None else presidio_type.lower()
     
     def _deduplicate_entities(self, entities: List[PIIEntity]) -> List[PIIEntity]:
         if not entities:
             return []
         
-        entities.sort(key=lambda x: x.confidence, reverse=True)
-        
-        unique_entities = []
-        seen_texts = set()
-        
-        for entity in entities:
-            if entity.text.lower() not in seen_texts:
-                unique_entities.append(entity)
-                seen_texts.add(entity.text.lower())
+        # Single pass keeping the most confident entity per text; ties keep the first seen
+        best = {}
+        for index, entity in enumerate(entities):
+            key = entity.text.lower()
+            current = best.get(key)
+            if current is None or entity.confidence > current[1].confidence:
+                best[key] = (index, entity)
         
-        return unique_entities
+        # Most confident first, equal confidences in input order, as the stable sort gave
+        survivors = sorted(best.values(), key=lambda item: (-item[1].confidence, item[0]))
+        return [entity for _, entity in survivors]
     
     def _fallback_detection(self, text_blocks: List[Dict]) -> List[PIIEntity]:
         entities = []
@@ -181,4 +242,39 @@ class AdvancedPIIDetector:
             custom_entities = self._detect_custom_patterns(text, block)
             entities.extend(custom_entities)
         
-        return entities
\ No newline at end of file
+        return entities
+
+
+# Text-only part of the custom scan, memoized; bboxes are attached per block
+@lru_cache(maxsize=1024)
+def _match_custom_patterns(text: str) -> Tuple[Tuple[str, str, float], ...]:
+    matches_found = []
+    
+    # Check if text should be excluded
+    if should_exclude_text(text):
+        return ()
+    
+    # Get precompiled patterns from modular file
+    patterns = get_compiled_pii_patterns()
+    features = text_features(text)
+    # Computed once per block rather than per match
+    is_four_char_block = len(text.strip()) == 4
+    
+    for entity_type, pattern_list in patterns.items():
+        required = ENTITY_REQUIREMENTS.get(entity_type, 0)
+        if features & required != required:
+            continue
+        
+        for pattern in pattern_list:
+            # Standalone 4-digit matches are only kept, at lower confidence, when they are the whole block
+            if pattern.pattern == AADHAAR_SEGMENT_PATTERN:
+                if not is_four_char_block:
+                    continue
+                confidence = 0.8
+            else:
+                confidence = 0.95
+            
+            for match in pattern.finditer(text):
+                matches_found.append((match.group(), entity_type, confidence))
+    
+    return tuple(matches_found)
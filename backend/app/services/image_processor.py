@@ -1,6 +1,6 @@
 import cv2
 import numpy as np
-from typing import List
+from typing import List, Optional, Tuple
 from ..models import PIIEntity
 import logging
 
@@ -10,14 +10,41 @@ class ImageProcessor:
     def __init__(self):
         logger.info("Image Processor initialized")
     
+    def mask_and_preview(self, image_path: str, entities: List[PIIEntity], image_bytes: Optional[bytes] = None) -> Tuple[str, str]:
+        # Decode once and draw the mask and the preview on separate copies
+        image = self._decode_image(image_path, image_bytes)
+        if image is None:
+            logger.error(f"Could not read image: {image_path}")
+            return image_path, image_path
+        
+        masked_image_path = self._write_masked(image_path, image.copy(), entities)
+        preview_image_path = self._write_preview(image_path, image, entities)
+        return masked_image_path, preview_image_path
+    
     def mask_pii_areas(self, image_path: str, entities: List[PIIEntity]) -> str:
-        logger.info(f"Masking {len(entities)} PII entities in {image_path}")
+        image = self._decode_image(image_path)
+        if image is None:
+            logger.error(f"Could not read image: {image_path}")
+            return image_path
         
-        image = cv2.imread(image_path)
+        return self._write_masked(image_path, image, entities)
+    
+    def create_preview(self, image_path: str, entities: List[PIIEntity]) -> str:
+        image = self._decode_image(image_path)
         if image is None:
             logger.error(f"Could not read image: {image_path}")
             return image_path
         
+        return self._write_preview(image_path, image, entities)
+    
+    def _decode_image(self, image_path: str, image_bytes: Optional[bytes] = None) -> Optional[np.ndarray]:
+        if image_bytes is None:
+            return cv2.imread(image_path)
+        return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    
+    def _write_masked(self, image_path: str, image: np.ndarray, entities: List[PIIEntity]) -> str:
+        logger.info(f"Masking {len(entities)} PII entities in {image_path}")
+        
         height, width = image.shape[:2]
         logger.info(f"Image dimensions: {width}x{height}")
         
@@ -27,7 +54,7 @@ class ImageProcessor:
                 
                 if 0 <= x < width and 0 <= y < height and w > 0 and h > 0:
                     self._apply_mask(image, x, y, w, h, entity.entity_type)
-                    logger.debug(f"Masked {entity.entity_type}: '{entity.text}' at ({x}, {y}, {w}, {h})")
+                    logger.debug("Masked %s: '%s' at (%d, %d, %d, %d)", entity.entity_type, entity.text, x, y, w, h)
         
         output_path = image_path.replace('.jpg', '_masked.jpg').replace('.png', '_masked.png')
         cv2.imwrite(output_path, image)
@@ -35,14 +62,9 @@ class ImageProcessor:
         
         return output_path
     
-    def create_preview(self, image_path: str, entities: List[PIIEntity]) -> str:
+    def _write_preview(self, image_path: str, image: np.ndarray, entities: List[PIIEntity]) -> str:
         logger.info(f"Creating preview for {len(entities)} PII entities in {image_path}")
         
-        image = cv2.imread(image_path)
-        if image is None:
-            logger.error(f"Could not read image: {image_path}")
-            return image_path
-        
         height, width = image.shape[:2]
         logger.info(f"Image dimensions: {width}x{height}")
         
@@ -56,7 +78,7 @@ class ImageProcessor:
                     label = self._get_entity_label(entity.entity_type)
                     cv2.putText(image, label, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
                     
-                    logger.debug(f"Preview box for {entity.entity_type}: '{entity.text}' at ({x}, {y}, {w}, {h})")
+                    logger.debug("Preview box for %s: '%s' at (%d, %d, %d, %d)", entity.entity_type, entity.text, x, y, w, h)
         
         output_path = image_path.replace('.jpg', '_preview.jpg').replace('.png', '_preview.png')
         cv2.imwrite(output_path, image)
@@ -1,8 +1,12 @@
 import cv2
 import numpy as np
-from typing import Dict, List
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import copy
+import hashlib
 import logging
 import os
+import threading
 
 try:
     from PIL import Image
@@ -13,10 +17,28 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Padding (px) kept around the detected text region before OCR
+TEXT_REGION_MARGIN = 10
+
+# Number of OCR results kept in memory, keyed by the SHA-256 of the image bytes
+OCR_CACHE_SIZE = 32
+
+# Longest side (px) handed to EasyOCR; larger images are downscaled first.
+# ID-card text stays legible well below this, but phone photos are often 4000px+.
+OCR_MAX_SIDE = 2048
+
 class OCRService:
     def __init__(self):
         logger.info("OCR Service initialized")
         
+        # Built once and reused by every text-region detection
+        self._morph_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+        
+        # Re-uploads of the same image skip OCR. Kept in memory only, so no
+        # extracted PII is written to disk; the lock guards it across request threads.
+        self._result_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
         try:
             import easyocr
             self.easyocr_reader = easyocr.Reader(['en', 'hi'])
@@ -33,7 +55,7 @@ class OCRService:
             logger.warning(f"Tesseract not available: {e}")
             self.tesseract_available = False
     
-    def extract_text_from_image(self, image_path: str) -> Dict:
+    def extract_text_from_image(self, image_path: str, image_bytes: Optional[bytes] = None) -> Dict:
         logger.info(f"Extracting text from: {image_path}")
         
         if not os.path.exists(image_path):
@@ -46,10 +68,20 @@ class OCRService:
             }
         
         try:
+            if image_bytes is None:
+                with open(image_path, 'rb') as f:
+                    image_bytes = f.read()
+            
+            cache_key = hashlib.sha256(image_bytes).hexdigest()
+            cached = self._get_cached_result(cache_key)
+            if cached is not None:
+                logger.info("Using cached OCR result")
+                return cached
+            
             if self.easyocr_reader:
-                return self._extract_with_easyocr(image_path)
+                result = self._extract_with_easyocr(image_path, image_bytes)
             elif self.tesseract_available:
-                return self._extract_with_tesseract(image_path)
+                result = self._extract_with_tesseract(image_path)
             else:
                 return {
                     'success': False,
@@ -58,6 +90,10 @@ class OCRService:
                     'text_blocks': [],
                     'total_blocks': 0
                 }
+            
+            if result.get('success'):
+                self._cache_result(cache_key, result)
+            return result
         except Exception as e:
             logger.error(f"OCR extraction failed: {e}")
             return {
@@ -68,20 +104,56 @@ class OCRService:
                 'total_blocks': 0
             }
     
-    def _extract_with_easyocr(self, image_path: str) -> Dict:
+    def _get_cached_result(self, cache_key: str) -> Optional[Dict]:
+        with self._cache_lock:
+            result = self._result_cache.get(cache_key)
+            if result is None:
+                return None
+            self._result_cache.move_to_end(cache_key)
+        # Callers get their own copy so they can't alter the cached blocks
+        return copy.deepcopy(result)
+    
+    def _cache_result(self, cache_key: str, result: Dict):
+        with self._cache_lock:
+            self._result_cache[cache_key] = copy.deepcopy(result)
+            self._result_cache.move_to_end(cache_key)
+            if len(self._result_cache) > OCR_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+    
+    def _extract_with_easyocr(self, image_path: str, image_bytes: bytes) -> Dict:
         try:
-            results = self.easyocr_reader.readtext(image_path)
+            image = self._decode_image(image_bytes)
+            if image is None:
+                raise ValueError(f"Could not read image: {image_path}")
+            
+            # Only hand EasyOCR the part of the image that actually has ink on it
+            region_x, region_y, region_w, region_h = self._detect_text_region(image)
+            region = image[region_y:region_y + region_h, region_x:region_x + region_w]
+            
+            scale = min(1.0, OCR_MAX_SIDE / max(region_w, region_h))
+            if scale < 1.0:
+                region = cv2.resize(region, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                logger.info(f"Downscaled {region_w}x{region_h} region by {scale:.2f} for OCR")
+            
+            results = self.easyocr_reader.readtext(cv2.cvtColor(region, cv2.COLOR_BGR2RGB))
+            
+            # Bounding boxes of all results as one (N, 4, 2) array: the min/max corners
+            # of every quad in a single vectorized pass instead of per-point loops
+            if results:
+                # Divided by the downscale factor to get back to full-resolution pixels
+                corners = np.array([bbox for bbox, _, _ in results], dtype=np.float64) / scale
+                mins = corners.min(axis=1).astype(np.int64)
+                sizes = (corners.max(axis=1) - mins).astype(np.int64)
+                
+                # Translate back to original image coordinates
+                origins = (mins + (region_x, region_y)).tolist()
+                sizes = sizes.tolist()
             
             text_blocks = []
-            for (bbox, text, confidence) in results:
+            for i, (_, text, confidence) in enumerate(results):
                 if text.strip():
-                    x_coords = [point[0] for point in bbox]
-                    y_coords = [point[1] for point in bbox]
-                    
-                    x = int(min(x_coords))
-                    y = int(min(y_coords))
-                    width = int(max(x_coords) - x)
-                    height = int(max(y_coords) - y)
+                    x, y = origins[i]
+                    width, height = sizes[i]
                     
                     text_blocks.append({
                         'text': text.strip(),
@@ -97,6 +169,7 @@ class OCRService:
                 'success': True,
                 'method': 'easyocr',
                 'text_blocks': text_blocks,
+                'full_text': ' '.join(block['text'] for block in text_blocks),
                 'total_blocks': len(text_blocks)
             }
         
@@ -110,14 +183,44 @@ class OCRService:
                 'total_blocks': 0
             }
     
+    def _decode_image(self, image_bytes: bytes) -> Optional[np.ndarray]:
+        return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    
+    def _detect_text_region(self, image: np.ndarray) -> Tuple[int, int, int, int]:
+        height, width = image.shape[:2]
+        
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        binary = cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10
+        )
+        # Drop speckle noise so it doesn't stretch the region to the borders
+        binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, self._morph_kernel)
+        
+        points = cv2.findNonZero(binary)
+        if points is None:
+            return 0, 0, width, height
+        
+        x, y, w, h = cv2.boundingRect(points)
+        
+        # Pad so glyphs on the edge of the region are not clipped
+        margin = TEXT_REGION_MARGIN
+        x0, y0 = max(0, x - margin), max(0, y - margin)
+        x1, y1 = min(width, x + w + margin), min(height, y + h + margin)
+        
+        # Not worth cropping if the text already fills almost the whole image
+        if (x1 - x0) * (y1 - y0) >= 0.9 * width * height:
+            return 0, 0, width, height
+        
+        logger.info(f"Text region: ({x0}, {y0}, {x1 - x0}, {y1 - y0}) of {width}x{height}")
+        return x0, y0, x1 - x0, y1 - y0
+    
     def _extract_with_tesseract(self, image_path: str) -> Dict:
         try:
             import pytesseract
-            from PIL import Image
-            
-            image = Image.open(image_path)
             
-            data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+            # Hand the file path straight to the tesseract binary so the image
+            # is not decoded by PIL and re-encoded to a temp file first
+            data = pytesseract.image_to_data(image_path, output_type=pytesseract.Output.DICT)
             
             text_blocks = []
             for i in range(len(data['text'])):
@@ -137,6 +240,7 @@ class OCRService:
                 'success': True,
                 'method': 'tesseract',
                 'text_blocks': text_blocks,
+                'full_text': ' '.join(block['text'] for block in text_blocks),
                 'total_blocks': len(text_blocks)
             }
         
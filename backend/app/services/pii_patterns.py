@@ -1,4 +1,4 @@
-
+import re
 
 
 ORG_KEYWORDS = [
@@ -24,12 +24,55 @@ HINDI_EXCLUSIONS = [
     'लेखा संख्या'
 ]
 
+INDIAN_CITIES = [
+    'pune', 'mumbai', 'delhi', 'bangalore', 'chennai', 'kolkata', 'hyderabad',
+    'ahmedabad', 'jaipur', 'surat', 'nagpur', 'indore', 'thane', 'bhopal',
+    'visakhapatnam', 'patna', 'vadodara', 'ghaziabad', 'lucknow', 'agra',
+    'nashik', 'faridabad', 'meerut', 'rajkot', 'kalyan', 'vasai', 'aurangabad',
+    'noida', 'howrah', 'coimbatore', 'raipur', 'jabalpur', 'gwalior',
+    'vijayawada', 'jodhpur', 'madurai', 'guwahati', 'chandigarh',
+    'thiruvananthapuram', 'srinagar', 'amritsar', 'allahabad', 'ranchi'
+]
+
+INDIAN_STATES = [
+    'maharashtra', 'karnataka', 'tamil nadu', 'west bengal', 'telangana',
+    'andhra pradesh', 'punjab', 'haryana', 'gujarat', 'rajasthan',
+    'uttar pradesh', 'bihar', 'jharkhand', 'odisha', 'chhattisgarh',
+    'madhya pradesh', 'himachal pradesh', 'uttarakhand', 'sikkim',
+    'arunachal pradesh', 'assam', 'manipur', 'meghalaya', 'mizoram', 'nagaland',
+    'tripura', 'goa', 'kerala'
+]
+
+def _trie_regex(words):
+    # Prefix-factored alternation, e.g. ['pune', 'punjab'] -> pun(?:e|jab), so the
+    # regex engine tries each shared prefix once instead of once per word
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node):
+        is_word_end = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not is_word_end:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if is_word_end else group
+    
+    return '(?:' + build(trie) + ')'
+
+AADHAAR_SEGMENT_PATTERN = r'\b\d{4}\b'
+
 # PII Detection Patterns
 PII_PATTERNS = {
     'aadhaar_number': [
         r'\b\d{4}\s?\d{4}\s?\d{4}\b',  # 1234 5678 9012
         r'\b\d{12}\b',                  # 123456789012
-        r'\b\d{4}\b',                   # Last 4 digits (if standalone)
+        AADHAAR_SEGMENT_PATTERN,        # Last 4 digits (if standalone)
     ],
     
     'pan_number': [
@@ -109,36 +152,92 @@ PII_PATTERNS = {
         r'\b(?:flat no|flat number|apartment no|apartment number|house no|house number)\s*[:.]?\s*[A-Z0-9]+\b',
         
         # Indian cities
-        r'\b(?:pune|mumbai|delhi|bangalore|chennai|kolkata|hyderabad|ahmedabad|jaipur|surat|nagpur|indore|thane|bhopal|visakhapatnam|patna|vadodara|ghaziabad|lucknow|agra|nashik|faridabad|meerut|rajkot|kalyan|vasai|aurangabad|noida|howrah|coimbatore|raipur|jabalpur|gwalior|vijayawada|jodhpur|madurai|guwahati|chandigarh|thiruvananthapuram|srinagar|amritsar|allahabad|ranchi)\b',
+        r'\b' + _trie_regex(INDIAN_CITIES) + r'\b',
         
         # Indian states
-        r'\b(?:maharashtra|karnataka|tamil nadu|west bengal|telangana|andhra pradesh|punjab|haryana|gujarat|rajasthan|uttar pradesh|bihar|jharkhand|odisha|chhattisgarh|madhya pradesh|himachal pradesh|uttarakhand|sikkim|arunachal pradesh|assam|manipur|meghalaya|mizoram|nagaland|tripura|goa|kerala)\b',
+        r'\b' + _trie_regex(INDIAN_STATES) + r'\b',
         
         # Common address words
         r'\b(?:wing|floor|building|complex|society|colony|area|locality|park|garden|nagar|vihar|ashram|residency|apartments)\b',
     ]
 }
 
+def _pattern_flags(pattern: str) -> int:
+    # Purely numeric patterns (only \d, \s, \b escapes) gain nothing from IGNORECASE,
+    # which just makes the matcher case-fold every character it compares
+    return re.IGNORECASE if re.search(r'(?<!\\)[A-Za-z]', pattern) else 0
+
+# Compiled once at import so detectors don't re-parse the sources per block
+COMPILED_PII_PATTERNS = {
+    entity_type: [re.compile(pattern, _pattern_flags(pattern)) for pattern in pattern_list]
+    for entity_type, pattern_list in PII_PATTERNS.items()
+}
+
+# One alternation per entity type, for callers that only need to know whether
+# any pattern of that type matches: a single search instead of one per pattern
+COMBINED_PII_PATTERNS = {
+    entity_type: re.compile(
+        '|'.join(f'(?:{pattern})' for pattern in pattern_list),
+        re.IGNORECASE if any(_pattern_flags(pattern) for pattern in pattern_list) else 0
+    )
+    for entity_type, pattern_list in PII_PATTERNS.items()
+}
+
+# Cheap per-block features, cached as bit flags. An entity type whose patterns all
+# need a feature is skipped for text that lacks it.
+HAS_DIGIT = 1
+HAS_AT = 2
+
+ENTITY_REQUIREMENTS = {
+    'aadhaar_number': HAS_DIGIT,
+    'pan_number': HAS_DIGIT,
+    'phone_number': HAS_DIGIT,
+    'pincode': HAS_DIGIT,
+    'date_time': HAS_DIGIT,
+    'email': HAS_AT,
+}
+
+_DIGIT_RE = re.compile(r'\d')
+
+def _minimal_keywords(keywords):
+    # For an "any keyword in text" check a keyword containing another keyword can
+    # never decide the result, so only the shortest distinct ones are scanned
+    unique = list(dict.fromkeys(keywords))
+    return tuple(k for k in unique if not any(other != k and other in k for other in unique))
+
+_ORG_SCAN_KEYWORDS = _minimal_keywords([keyword.lower() for keyword in ORG_KEYWORDS])
+_HINDI_SCAN_EXCLUSIONS = _minimal_keywords(HINDI_EXCLUSIONS)
+
+# All exclusion keywords as one prefix-factored alternation, so a block is checked
+# in a single scan instead of one substring search per keyword. Lowercasing leaves Devanagari
+# untouched, so the Hindi exclusions can be matched against the lowered text too.
+_EXCLUSION_RE = re.compile(_trie_regex(_ORG_SCAN_KEYWORDS + _HINDI_SCAN_EXCLUSIONS))
+
 def should_exclude_text(text: str) -> bool:
     
-    text_lower = text.lower()
-    text_stripped = text.strip()
-    
+    return _EXCLUSION_RE.search(text.lower()) is not None
 
-    if any(keyword in text_lower for keyword in ORG_KEYWORDS):
-        return True
-    
+def text_features(text: str) -> int:
     
-    for exclusion in HINDI_EXCLUSIONS:
-        if exclusion in text_stripped or exclusion in text:
-            return True
-    
-    return False
+    features = 0
+    if _DIGIT_RE.search(text):
+        features |= HAS_DIGIT
+    if '@' in text:
+        features |= HAS_AT
+    return features
 
 def get_pii_patterns():
     
     return PII_PATTERNS
 
+def get_compiled_pii_patterns():
+    
+    return COMPILED_PII_PATTERNS
+
+def get_combined_pii_patterns():
+    
+    return COMBINED_PII_PATTERNS
+
 def get_org_keywords():
 
     return ORG_KEYWORDS
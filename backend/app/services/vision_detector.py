@@ -1,46 +1,63 @@
-import cv2
-import numpy as np
-from typing import List, Dict
+from PIL import Image
+import io
+from typing import List, Dict, Optional, Tuple
+from functools import cached_property, lru_cache
 from ..models import PIIEntity
 import logging
-import re
-from .pii_patterns import get_pii_patterns, should_exclude_text
+from .pii_patterns import ENTITY_REQUIREMENTS, text_features, get_combined_pii_patterns, should_exclude_text
 
 logger = logging.getLogger(__name__)
 
 class VisionDetector:
     def __init__(self):
         logger.info("Vision Detector initialized")
-        
+    
+    @cached_property
+    def advanced_detector(self):
+        # Imported and built on first detection rather than at service start-up
         try:
             from .advanced_pii_detector import AdvancedPIIDetector
-            self.advanced_detector = AdvancedPIIDetector()
+            advanced_detector = AdvancedPIIDetector()
             logger.info("Advanced PII Detector initialized")
+            return advanced_detector
         except Exception as e:
             logger.warning(f"Advanced PII Detector not available: {e}")
-            self.advanced_detector = None
+            return None
+    
+    def warm_up(self):
+        # Load the spaCy models and run one analysis at start-up so the first request doesn't pay for it
+        try:
+            analyzer = self.advanced_detector.presidio_analyzer if self.advanced_detector else None
+            if analyzer:
+                analyzer.analyze(text="warmup", entities=["PERSON"], language="en")
+                logger.info("Presidio analyzer warmed up")
+        except Exception as e:
+            logger.warning(f"Presidio warm-up failed: {e}")
     
-    def detect_pii_from_image(self, image_path: str, ocr_data: Dict = None) -> List[PIIEntity]:
+    def detect_pii_from_image(self, image_path: str, ocr_data: Dict = None, image_bytes: Optional[bytes] = None) -> List[PIIEntity]:
         logger.info(f"PII detection on: {image_path}")
         
-        # Image validation
-        image = cv2.imread(image_path)
-        if image is None:
+        # Image validation; only the header is read, the pixels are not needed here
+        try:
+            # Use the bytes the caller already holds (e.g. the upload) instead of reopening the file
+            source = io.BytesIO(image_bytes) if image_bytes is not None else image_path
+            with Image.open(source) as image:
+                width, height = image.size
+        except Exception:
             logger.error(f"Could not read image: {image_path}")
             return []
         
-        height, width = image.shape[:2]
         logger.info(f"Image dimensions: {width}x{height}")
         
         # OCR data validation
         if ocr_data and ocr_data.get('success') and ocr_data.get('text_blocks'):
             logger.info("Using OCR data for PII detection")
-            return self._detect_from_ocr(ocr_data.get('text_blocks'), width, height)
+            return self._detect_from_ocr(ocr_data.get('text_blocks'))
         else:
             logger.warning("No OCR data available - AI-based detection requires OCR")
             return []
     
-    def _detect_from_ocr(self, text_blocks: List[Dict], width: int, height: int) -> List[PIIEntity]:
+    def _detect_from_ocr(self, text_blocks: List[Dict]) -> List[PIIEntity]:
         # Try advanced detection first
         if self.advanced_detector:
             logger.info("Using advanced PII detection with Presidio")
@@ -54,11 +71,11 @@ class VisionDetector:
         logger.info("Using basic pattern matching as fallback")
         entities = []
         
-        for block in text_blocks:
-            text = block.get('text', '').strip()
-            if not text:
-                continue
-            
+        # Empty blocks are dropped up front so the loop only sees text to classify
+        stripped_blocks = ((block.get('text', '').strip(), block) for block in text_blocks)
+        nonempty_blocks = [(text, block) for text, block in stripped_blocks if text]
+        
+        for text, block in nonempty_blocks:
             entity = self._detect_basic_patterns(text, block)
             if entity:
                 entities.append(entity)
@@ -67,27 +84,43 @@ class VisionDetector:
         return entities
     
     def _detect_basic_patterns(self, text: str, block: Dict) -> PIIEntity:
-        # Use modular patterns from pii_patterns.py
-        if should_exclude_text(text):
+        match = _classify_text(text)
+        if match is None:
             return None
         
-        patterns = get_pii_patterns()
-        
-        # Check each pattern type
-        for entity_type, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                if re.search(pattern, text, re.IGNORECASE):
-                    # Special handling for Aadhaar 4-digit patterns
-                    if entity_type == 'aadhaar_number' and len(text.strip()) == 4 and text.isdigit():
-                        confidence = 0.8
-                    else:
-                        confidence = 0.95 if entity_type in ['aadhaar_number', 'pan_number'] else 0.85
-                    
-                    return PIIEntity(
-                        text=text,
-                        entity_type=entity_type,
-                        confidence=confidence,
-                        bbox=[block['x'], block['y'], block['width'], block['height']]
-                    )
+        entity_type, confidence = match
+        return PIIEntity(
+            text=text,
+            entity_type=entity_type,
+            confidence=confidence,
+            bbox=[block['x'], block['y'], block['width'], block['height']]
+        )
+
+
+# OCR repeats the same strings (labels, numbers printed twice) across blocks,
+# so the text -> (entity_type, confidence) classification is memoized
+@lru_cache(maxsize=1024)
+def _classify_text(text: str) -> Optional[Tuple[str, float]]:
+    # Use modular patterns from pii_patterns.py
+    if should_exclude_text(text):
+        return None
+    
+    # A bare 4-digit block is an Aadhaar segment; the type is known without a regex
+    # scan. isdecimal() matches the characters re's \d does.
+    if len(text) == 4 and text.isdecimal():
+        return 'aadhaar_number', 0.8
+    
+    patterns = get_combined_pii_patterns()
+    features = text_features(text)
+    
+    # Check each pattern type, in order; the first type that matches wins
+    for entity_type, pattern in patterns.items():
+        required = ENTITY_REQUIREMENTS.get(entity_type, 0)
+        if features & required != required:
+            continue
         
-        return None 
\ No newline at end of file
+        if pattern.search(text):
+            confidence = 0.95 if entity_type in ['aadhaar_number', 'pan_number'] else 0.85
+            return entity_type, confidence
+    
+    return None